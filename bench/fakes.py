@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Local fake ESI and Discord API servers for the benchmark stack.
+
+Both servers are stdlib only so they run in a plain python:3.11-slim
+container. Every request is counted per route; `GET /_stats` returns the
+counters and `POST /_stats` clears them.
+
+Usage:
+  python bench/fakes.py esi [--port 8080]
+  python bench/fakes.py discord [--port 8080] [--members 2000]
+  python bench/fakes.py fetch-esi-spec       # one-time download of the ESI spec fixture
+
+The fake ESI answers every operation in the spec fixture with a minimal
+response generated from its schema (empty lists, placeholder objects), so
+django-esi clients validate without talking to CCP. Its SSO endpoints
+always answer 503, so token refreshes fail without reaching CCP.
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+import urllib.request
+from collections import Counter
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+ESI_SPEC_PATH = FIXTURES / "esi_swagger.json"
+ESI_SPEC_URL = "https://esi.evetech.net/latest/swagger.json"
+
+# Discord defaults, roughly matching the real per-route buckets
+DISCORD_BUCKET_LIMIT = 10
+DISCORD_BUCKET_RESET = 1.0
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    """Shared request plumbing: JSON replies, per-route counters and /_stats."""
+
+    protocol_version = "HTTP/1.1"
+    stats = Counter()
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def route_key(self, path):
+        return re.sub(r"/\d+", "/{id}", path)
+
+    def send_json(self, status, body=None, headers=None):
+        payload = b"" if body is None else json.dumps(body).encode()
+        self.send_response(status)
+        if body is not None:
+            self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"null") if length else None
+
+    def handle_any(self):
+        path = re.sub(r"/+", "/", self.path.split("?", 1)[0])
+        if path == "/_stats":
+            with self.stats_lock:
+                if self.command == "POST":
+                    self.stats.clear()
+                    return self.send_json(204)
+                return self.send_json(200, dict(self.stats))
+
+        with self.stats_lock:
+            self.stats[f"{self.command} {self.route_key(path)}"] += 1
+        self.read_body()
+        self.dispatch(path)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = handle_any
+
+    def dispatch(self, path):
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------------
+# ESI
+# ---------------------------------------------------------------------------
+
+
+def resolve(spec, schema):
+    while "$ref" in schema:
+        node = spec
+        for part in schema["$ref"].lstrip("#/").split("/"):
+            node = node[part]
+        schema = node
+    return schema
+
+
+def example_for(spec, schema):
+    """Build the smallest value that satisfies a response schema."""
+    schema = resolve(spec, schema or {})
+    kind = schema.get("type", "object")
+    if "enum" in schema:
+        return schema["enum"][0]
+    if kind == "array":
+        return []
+    if kind == "object":
+        props = schema.get("properties", {})
+        return {
+            name: example_for(spec, props[name])
+            for name in schema.get("required", [])
+            if name in props
+        }
+    if kind in ("integer", "number"):
+        return schema.get("minimum", 1)
+    if kind == "boolean":
+        return False
+    if schema.get("format") == "date-time":
+        return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    if schema.get("format") == "date":
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    return "fake"
+
+
+class FakeESIHandler(FakeHandler):
+    spec = None
+    routes = []
+
+    @classmethod
+    def load_spec(cls, spec_path: Path):
+        spec = json.loads(spec_path.read_text())
+        cls.spec = spec
+        cls.routes = []
+        for route, operations in spec["paths"].items():
+            pattern = re.compile("^" + re.sub(r"\{[^}]+\}", r"[^/]+", route) + "$")
+            for method, operation in operations.items():
+                if method == "parameters":
+                    continue
+                response = operation.get("responses", {}).get("200", {})
+                body = example_for(spec, response.get("schema"))
+                cls.routes.append((method.upper(), pattern, body))
+
+    def dispatch(self, path):
+        if path.startswith(("/v2/oauth", "/oauth")):
+            # SSO is never faked successfully, so no token is ever refreshed or rotated
+            return self.send_json(503, {"error": "SSO is not available in the benchmark stack"})
+        if path.endswith("/swagger.json"):
+            spec = dict(self.spec, host=self.headers["Host"], schemes=["http"])
+            return self.send_json(200, spec)
+
+        base = self.spec.get("basePath", "/latest")
+        route = path[len(base):] if path.startswith(base) else re.sub(r"^/[^/]+", "", path)
+        for method, pattern, body in self.routes:
+            if method == self.command and pattern.match(route):
+                return self.send_json(
+                    200,
+                    body,
+                    {
+                        "X-Pages": "1",
+                        "Expires": "Thu, 01 Jan 2099 00:00:00 GMT",
+                        "X-Esi-Error-Limit-Remain": "100",
+                        "X-Esi-Error-Limit-Reset": "60",
+                    },
+                )
+        self.send_json(404, {"error": "Not found"})
+
+
+def fetch_esi_spec():
+    FIXTURES.mkdir(exist_ok=True)
+    print(f"Downloading {ESI_SPEC_URL} -> {ESI_SPEC_PATH}")
+    with urllib.request.urlopen(ESI_SPEC_URL, timeout=60) as response:
+        ESI_SPEC_PATH.write_bytes(response.read())
+
+
+# ---------------------------------------------------------------------------
+# Discord
+# ---------------------------------------------------------------------------
+
+
+class FakeDiscordHandler(FakeHandler):
+    members = []
+    roles = []
+    buckets = {}
+
+    @classmethod
+    def populate(cls, count: int):
+        cls.roles = [{"id": str(1000 + i), "name": f"Role {i}", "managed": False} for i in range(20)]
+        cls.members = [
+            {
+                "user": {"id": str(10_000 + i), "username": f"user{i}", "discriminator": "0"},
+                "nick": f"Pilot {i}",
+                "roles": [cls.roles[i % len(cls.roles)]["id"]],
+            }
+            for i in range(count)
+        ]
+
+    def rate_limit_headers(self, bucket):
+        now = time.monotonic()
+        with self.stats_lock:
+            remaining, reset_at = self.buckets.get(bucket, (DISCORD_BUCKET_LIMIT, 0.0))
+            if now >= reset_at:
+                remaining, reset_at = DISCORD_BUCKET_LIMIT, now + DISCORD_BUCKET_RESET
+            if remaining == 0:
+                return None, reset_at - now
+            self.buckets[bucket] = (remaining - 1, reset_at)
+        return {
+            "X-RateLimit-Bucket": bucket,
+            "X-RateLimit-Limit": str(DISCORD_BUCKET_LIMIT),
+            "X-RateLimit-Remaining": str(remaining - 1),
+            "X-RateLimit-Reset-After": f"{reset_at - now:.3f}",
+        }, 0
+
+    def dispatch(self, path):
+        route = re.sub(r"^/api(/v\d+)?", "", path)
+        headers, retry_after = self.rate_limit_headers(f"{self.command} {self.route_key(route)}")
+        if headers is None:
+            with self.stats_lock:
+                self.stats["429"] += 1
+            return self.send_json(429, {"retry_after": retry_after, "global": False})
+
+        if self.command == "GET" and re.match(r"^/guilds/\d+/members$", route):
+            query = dict(p.split("=", 1) for p in self.path.partition("?")[2].split("&") if "=" in p)
+            after = int(query.get("after", 0))
+            limit = int(query.get("limit", 1))
+            page = [m for m in self.members if int(m["user"]["id"]) > after][:limit]
+            return self.send_json(200, page, headers)
+        if self.command == "GET" and re.match(r"^/guilds/\d+/roles$", route):
+            return self.send_json(200, self.roles, headers)
+        if self.command == "GET" and re.match(r"^/guilds/\d+/members/\d+$", route):
+            return self.send_json(200, self.members[0] if self.members else {}, headers)
+        if self.command in ("PATCH", "PUT", "DELETE") and route.startswith("/guilds/"):
+            return self.send_json(204, None, headers)
+        if route == "/users/@me":
+            return self.send_json(200, {"id": "1", "username": "fake-bot", "discriminator": "0"}, headers)
+        self.send_json(200, {}, headers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("server", choices=["esi", "discord", "fetch-esi-spec"])
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--members", type=int, default=2000, help="Fake Discord guild size")
+    args = parser.parse_args()
+
+    if args.server == "fetch-esi-spec":
+        fetch_esi_spec()
+        return
+
+    if args.server == "esi":
+        if not ESI_SPEC_PATH.exists():
+            raise SystemExit(
+                f"ESI spec fixture missing at {ESI_SPEC_PATH}. "
+                "Run `python bench/fakes.py fetch-esi-spec` once."
+            )
+        FakeESIHandler.load_spec(ESI_SPEC_PATH)
+        handler = FakeESIHandler
+    else:
+        FakeDiscordHandler.populate(args.members)
+        handler = FakeDiscordHandler
+
+    print(f"Fake {args.server} listening on :{args.port}", flush=True)
+    ThreadingHTTPServer(("0.0.0.0", args.port), handler).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
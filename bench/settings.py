@@ -0,0 +1,87 @@
+# Benchmark settings: production local.py with every external integration
+# pointed at the fake servers or blanked, so a run on a production dump
+# cannot touch real tokens, channels or mailboxes.
+# Mounted as myauth/settings/bench.py by bench/docker-compose.bench.yml.
+import threading
+
+from celery.signals import task_postrun, task_prerun
+
+from .local import *
+
+ALLOWED_HOSTS = ["*"]
+
+# django-esi: ESI and the SSO token/verify endpoints go to the fake ESI.
+# The client credentials are blanked as well, so even a missed SSO URL fails
+# authentication instead of rotating a real refresh token.
+ESI_API_URL = "http://fake_esi:8080/"
+ESI_SPEC_CACHE_DURATION = 0
+ESI_OAUTH_URL = "http://fake_esi:8080/v2/oauth"
+ESI_TOKEN_URL = "http://fake_esi:8080/v2/oauth/token"
+ESI_TOKEN_VERIFY_URL = "http://fake_esi:8080/oauth/verify"
+ESI_TOKEN_JWK_SET_URL = "http://fake_esi:8080/oauth/jwks"
+ESI_SSO_CLIENT_ID = "bench"
+ESI_SSO_CLIENT_SECRET = "bench"
+
+# Discord (AA service client and myauth.discord_sync)
+DISCORD_API_BASE_URL = "http://fake_discord:8080/api/v10/"
+DISCORD_GUILD_ID = "1"
+DISCORD_APP_ID = "bench"
+DISCORD_APP_SECRET = "bench"
+DISCORD_BOT_TOKEN = "fake-bot-token"
+
+# Email and other integrations from the production .env
+EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+EMAIL_HOST = ""
+EMAIL_HOST_USER = ""
+EMAIL_HOST_PASSWORD = ""
+WIKIJS_API_KEY = ""
+WIKIJS_URL = ""
+WIKIJS_API_URL = ""
+WIKIJS_AADISCORDBOT_INTEGRATION = False
+REAUTH_REMINDER_CHANNEL_ID = None
+
+# Beat does not run during a benchmark, tasks are sent by scripts/benchmark.py
+CELERYBEAT_SCHEDULE = {}
+
+# Results let scripts/benchmark.py wait on the tasks it sends to the worker
+CELERY_RESULT_BACKEND = f"redis://{os.environ.get('AA_REDIS', 'redis:6379')}/2"
+
+# Per-task query counting in the worker, summed per root task in the cache
+BENCH_QUERY_KEY = "bench:queries:{}"
+_query_counters = {}
+_query_counters_lock = threading.Lock()
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+@task_prerun.connect
+def _bench_count_queries(task_id=None, task=None, **kwargs):
+    from django.db import connection
+
+    counter = _QueryCounter()
+    connection.execute_wrappers.append(counter)
+    with _query_counters_lock:
+        _query_counters[task_id] = (counter, task.request.root_id or task_id)
+
+
+@task_postrun.connect
+def _bench_store_queries(task_id=None, **kwargs):
+    from django.core.cache import cache
+    from django.db import connection
+
+    with _query_counters_lock:
+        counter, root_id = _query_counters.pop(task_id, (None, None))
+    if counter is None:
+        return
+    if counter in connection.execute_wrappers:
+        connection.execute_wrappers.remove(counter)
+    key = BENCH_QUERY_KEY.format(root_id)
+    cache.add(key, 0, 24 * 3600)
+    cache.incr(key, counter.count)
@@ -36,5 +36,8 @@ app.conf.task_routes = {"aadiscordbot.tasks.*": {"queue": "aadiscordbot"}}
 # Load task modules from all registered Django app configs.
 app.autodiscover_tasks(lambda: settings.INSTALLED_APPS)
 
+# Load project level task modules (myauth is not an installed app)
+app.autodiscover_tasks(['myauth'], related_name='discord_sync')
+
 # Remove result from default log message on task success
 trace.LOG_SUCCESS = "Task %(name)s[%(id)s] succeeded in %(runtime)ss"
@@ -0,0 +1,244 @@
+"""
+Bulk Discord Member Sync
+
+Replaces the per-user `discord.update_all_usernames` and
+`discord.update_all_nicknames` tasks with a single pass that fetches the
+guild member list once, diffs it against what auth expects in memory and
+only calls the Discord API for members that actually changed.
+
+Each run logs and returns how many API calls were made vs. skipped.
+
+Configuration (in local.py):
+    DISCORD_GUILD_ID: Guild to sync (required)
+    DISCORD_BOT_TOKEN: Bot token used for the API calls (required)
+    DISCORD_SYNC_NAMES: Sync nicknames to the auth formatted nick (default: False)
+    DISCORD_BULK_SYNC_ROLES: Sync group/state roles as well (default: True)
+    DISCORD_API_BASE_URL: Discord REST API base URL (default: https://discord.com/api/v10)
+"""
+
+import logging
+import time
+
+import requests
+from allianceauth.authentication.models import State
+from allianceauth.services.modules.discord.models import DiscordUser
+from allianceauth.services.tasks import QueueOnce
+from celery import shared_task
+from django.conf import settings
+from django.contrib.auth.models import Group
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASE_URL = "https://discord.com/api/v10"
+MEMBERS_PAGE_SIZE = 1000
+NICKNAME_MAX_LENGTH = 32
+MAX_RETRIES = 5
+
+
+class RateLimitedBatch:
+    """Executes queued Discord API calls, pacing them by the rate limit headers."""
+
+    def __init__(self, session: requests.Session, base_url: str):
+        self.session = session
+        self.base_url = base_url.rstrip("/")
+        self.queue = []
+        self.calls = 0
+        self.succeeded = 0
+        self.failed = 0
+        self._reset_at = 0.0
+
+    def add(self, method: str, path: str, payload: dict):
+        self.queue.append((method, path, payload))
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a single request, waiting out bucket exhaustion and 429s."""
+        for _ in range(MAX_RETRIES):
+            wait = self._reset_at - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            self.calls += 1
+            response = self.session.request(
+                method, f"{self.base_url}{path}", timeout=30, **kwargs
+            )
+
+            if response.status_code == 429:
+                retry_after = float(response.json().get("retry_after", 1))
+                logger.warning(
+                    f"DiscordSync: Rate limited on {path}, retrying in {retry_after}s"
+                )
+                self._reset_at = time.monotonic() + retry_after
+                continue
+
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                reset_after = float(response.headers.get("X-RateLimit-Reset-After", 1))
+                self._reset_at = time.monotonic() + reset_after
+            return response
+
+        response.raise_for_status()
+        return response
+
+    def execute(self):
+        """Run every queued call, collecting failures instead of aborting the batch."""
+        while self.queue:
+            method, path, payload = self.queue.pop(0)
+            try:
+                response = self.request(method, path, json=payload)
+                response.raise_for_status()
+                self.succeeded += 1
+            except requests.RequestException as e:
+                logger.error(f"DiscordSync: {method} {path} failed: {e}")
+                self.failed += 1
+
+
+def get_config():
+    """Get configuration from Django settings with defaults."""
+    return {
+        "guild_id": getattr(settings, "DISCORD_GUILD_ID", None),
+        "bot_token": getattr(settings, "DISCORD_BOT_TOKEN", None),
+        "sync_names": getattr(settings, "DISCORD_SYNC_NAMES", False),
+        "sync_roles": getattr(settings, "DISCORD_BULK_SYNC_ROLES", True),
+        "base_url": getattr(settings, "DISCORD_API_BASE_URL", DEFAULT_API_BASE_URL),
+    }
+
+
+def fetch_guild_members(batch: RateLimitedBatch, guild_id) -> dict:
+    """Fetch the whole guild member list, keyed by Discord user ID."""
+    members = {}
+    after = 0
+    while True:
+        response = batch.request(
+            "GET",
+            f"/guilds/{guild_id}/members",
+            params={"limit": MEMBERS_PAGE_SIZE, "after": after},
+        )
+        response.raise_for_status()
+        page = response.json()
+        for member in page:
+            members[int(member["user"]["id"])] = member
+        if len(page) < MEMBERS_PAGE_SIZE:
+            return members
+        after = max(int(member["user"]["id"]) for member in page)
+
+
+def fetch_managed_roles(batch: RateLimitedBatch, guild_id) -> dict:
+    """Return {role name: role ID} for the guild roles auth is responsible for."""
+    response = batch.request("GET", f"/guilds/{guild_id}/roles")
+    response.raise_for_status()
+
+    auth_names = set(Group.objects.values_list("name", flat=True))
+    auth_names.update(State.objects.values_list("name", flat=True))
+    return {
+        role["name"]: role["id"]
+        for role in response.json()
+        if role["name"] in auth_names
+        and not role.get("managed")
+        and role["id"] != str(guild_id)
+    }
+
+
+def expected_roles(discord_user, member: dict, managed_roles: dict):
+    """
+    Compute the role IDs the member should have.
+
+    Roles auth does not manage are kept as they are. Returns the role set and
+    the group names that have no matching Discord role yet.
+    """
+    managed_ids = set(managed_roles.values())
+    roles = {role_id for role_id in member["roles"] if role_id not in managed_ids}
+    missing = []
+    for name in DiscordUser.objects.user_group_names(discord_user.user):
+        if name in managed_roles:
+            roles.add(managed_roles[name])
+        else:
+            missing.append(name)
+    return roles, missing
+
+
+@shared_task(base=QueueOnce, once={"graceful": True})
+def sync_discord_members():
+    """Sync usernames, nicknames and roles for all linked Discord users in bulk."""
+    config = get_config()
+    if not config["guild_id"] or not config["bot_token"]:
+        logger.warning("DiscordSync: DISCORD_GUILD_ID or DISCORD_BOT_TOKEN not set")
+        return None
+
+    guild_id = int(config["guild_id"])
+    session = requests.Session()
+    session.headers["Authorization"] = f"Bot {config['bot_token']}"
+    batch = RateLimitedBatch(session, config["base_url"])
+
+    members = fetch_guild_members(batch, guild_id)
+    managed_roles = fetch_managed_roles(batch, guild_id) if config["sync_roles"] else {}
+    fetch_calls = batch.calls
+
+    renamed = []
+    not_in_guild = 0
+    skipped = 0
+    missing_roles = set()
+    discord_users = DiscordUser.objects.select_related(
+        "user__profile__main_character", "user__profile__state"
+    ).prefetch_related("user__groups")
+    for discord_user in discord_users:
+        member = members.get(discord_user.uid)
+        if member is None:
+            not_in_guild += 1
+            continue
+
+        # Usernames live in the auth database, so they never cost an API call
+        username = member["user"]["username"]
+        discriminator = member["user"].get("discriminator") or ""
+        if (discord_user.username, discord_user.discriminator) != (username, discriminator):
+            discord_user.username = username
+            discord_user.discriminator = discriminator
+            renamed.append(discord_user)
+
+        changes = {}
+        if config["sync_names"]:
+            nick = DiscordUser.objects.user_formatted_nick(discord_user.user)
+            if nick:
+                nick = nick[:NICKNAME_MAX_LENGTH]
+                if member.get("nick") != nick:
+                    changes["nick"] = nick
+
+        if config["sync_roles"]:
+            roles, missing = expected_roles(discord_user, member, managed_roles)
+            missing_roles.update(missing)
+            if roles != set(member["roles"]):
+                changes["roles"] = sorted(roles)
+
+        if changes:
+            batch.add("PATCH", f"/guilds/{guild_id}/members/{discord_user.uid}", changes)
+        else:
+            skipped += 1
+
+    if renamed:
+        DiscordUser.objects.bulk_update(renamed, ["username", "discriminator"])
+
+    updates = len(batch.queue)
+    batch.execute()
+
+    if missing_roles:
+        logger.warning(
+            f"DiscordSync: No Discord role for {', '.join(sorted(missing_roles))}, "
+            "left for the per-user group sync to create"
+        )
+
+    report = {
+        "members": len(members),
+        "linked_not_in_guild": not_in_guild,
+        "usernames_updated": len(renamed),
+        "calls_made": batch.calls,
+        "calls_fetch": fetch_calls,
+        "calls_update": batch.calls - fetch_calls,
+        "calls_skipped": skipped,
+        "updates_succeeded": batch.succeeded,
+        "updates_failed": batch.failed,
+    }
+    logger.info(
+        f"DiscordSync: {updates} member(s) changed, {skipped} unchanged; "
+        f"made {batch.calls} API call(s) ({fetch_calls} fetch, "
+        f"{batch.calls - fetch_calls} update), skipped {skipped}; "
+        f"{len(renamed)} username(s) updated, {batch.failed} failure(s)"
+    )
+    return report
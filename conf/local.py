@@ -130,10 +130,13 @@ DISCORD_APP_ID = env('DISCORD_APP_ID')
 DISCORD_APP_SECRET = env('DISCORD_APP_SECRET')
 DISCORD_BOT_TOKEN = env('DISCORD_BOT_TOKEN')
 DISCORD_SYNC_NAMES = env.bool('DISCORD_SYNC_NAMES', False)
+DISCORD_BULK_SYNC_ROLES = env.bool('DISCORD_BULK_SYNC_ROLES', True)
 
-CELERYBEAT_SCHEDULE['discord.update_all_usernames'] = {
-    'task': 'discord.update_all_usernames',
-    'schedule': crontab(minute=0, hour='*/12'),
+# Bulk Discord sync (usernames, nicknames and roles in one diffed pass)
+# Replaces discord.update_all_usernames and discord.update_all_nicknames
+CELERYBEAT_SCHEDULE['discord_sync_members'] = {
+    'task': 'myauth.discord_sync.sync_discord_members',
+    'schedule': crontab(minute=30),
 }
 
 ## Corp Tools
@@ -227,12 +230,6 @@ CELERYBEAT_SCHEDULE['fittings_update_types'] = {
     'schedule': crontab(minute=0, hour='12'),
 }
 
-# Update Discord Nicknames
-CELERYBEAT_SCHEDULE['discord_update_nicknames'] = {
-        'task': 'discord.update_all_nicknames',
-        'scshedule': crontab(minute=30),
-}
-
 # Wiki Stuff
 WIKIJS_API_KEY = env('WIKIJS_API_KEY')
 WIKIJS_URL = env('WIKIJS_URL')
@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+"""
+Benchmark helper for the Alliance Auth Docker deployment.
+
+Flow (run):
+ 1. Bring up the stack with bench/docker-compose.bench.yml
+    (local MariaDB with conf/aa_mariadb.cnf, fake ESI and fake Discord)
+ 2. Optionally load a database dump (e.g. from scripts/backup-db.sh), then migrate
+ 3. Create a session for a benchmark superuser
+ 4. Warm up, then drive the weighted web mix from bench/scenario.json
+ 5. Send the beat-scheduled tasks from conf/local.py to the bench worker one at a
+    time, waiting for each (and its subtasks) to drain; queries are counted in the
+    worker by bench/settings.py
+ 6. Sample container memory throughout and record DB status counter deltas
+ 7. Write a JSON report to bench/reports/
+
+compare: diff two reports and exit non-zero if anything regressed past the threshold.
+
+Run this from the repo root:
+  python scripts/benchmark.py run --label baseline [--db-dump aa-backup.sql.gz]
+  python scripts/benchmark.py compare bench/reports/a.json bench/reports/b.json
+"""
+
+import argparse
+import ast
+import gzip
+import hashlib
+import json
+import math
+import random
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SCENARIO_PATH = PROJECT_ROOT / "bench" / "scenario.json"
+REPORTS_DIR = PROJECT_ROOT / "bench" / "reports"
+ENV_PATH = PROJECT_ROOT / ".env"
+COMPOSE = [
+    "docker",
+    "compose",
+    "-p",
+    "aa-bench",
+    "-f",
+    "docker-compose.yml",
+    "-f",
+    "bench/docker-compose.bench.yml",
+]
+SERVICE_CLI = "aa_cli"
+SERVICE_DB = "auth_mysql"
+JSON_MARKER = "BENCH_JSON:"
+
+# Files whose contents define "the configuration" being benchmarked
+FINGERPRINT_FILES = [
+    "docker-compose.yml",
+    "custom.dockerfile",
+    "conf/aa_mariadb.cnf",
+    "conf/local.py",
+    "conf/celery.py",
+    "conf/requirements.txt",
+]
+
+# MariaDB status counters reported as deltas per phase
+DB_COUNTERS = [
+    "Questions",
+    "Com_select",
+    "Com_insert",
+    "Com_update",
+    "Com_delete",
+    "Slow_queries",
+    "Created_tmp_disk_tables",
+    "Innodb_buffer_pool_read_requests",
+    "Innodb_buffer_pool_reads",
+]
+
+SESSION_CODE = """
+import json
+from importlib import import_module
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+
+user, created = User.objects.get_or_create(username="aa_bench")
+if created:
+    user.is_superuser = user.is_staff = True
+    user.set_unusable_password()
+    user.save()
+session = import_module(settings.SESSION_ENGINE).SessionStore()
+session[SESSION_KEY] = str(user.pk)
+session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+session.create()
+print("BENCH_JSON:" + json.dumps({"name": settings.SESSION_COOKIE_NAME, "value": session.session_key}))
+"""
+
+TASK_CODE = """
+import json, time
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from myauth.celery import app
+
+broker = redis.Redis.from_url(settings.BROKER_URL)
+inspect = app.control.inspect(timeout=2)
+
+
+def queued():
+    # Priority steps give each queue several "celery*" lists in the broker db
+    return sum(broker.llen(key) for key in broker.keys("celery*") if broker.type(key) == b"list")
+
+
+def worker_busy():
+    for replies in (inspect.active(), inspect.reserved(), inspect.scheduled()):
+        if any((replies or {}).values()):
+            return True
+    return queued() > 0
+
+
+results = []
+for name in TASKS:
+    error = None
+    start = time.perf_counter()
+    result = app.send_task(name)
+    try:
+        result.get(timeout=TIMEOUT, propagate=True)
+        # Wait for the subtasks the beat task fanned out to finish as well
+        idle = 0
+        while idle < 2:
+            if time.perf_counter() - start > TIMEOUT:
+                raise TimeoutError(f"worker still busy after {TIMEOUT}s")
+            idle = 0 if worker_busy() else idle + 1
+            time.sleep(1)
+    except Exception as e:
+        error = repr(e)
+    results.append({
+        "task": name,
+        "seconds": time.perf_counter() - start,
+        "queries": cache.get(settings.BENCH_QUERY_KEY.format(result.id), 0),
+        "error": error,
+    })
+print("BENCH_JSON:" + json.dumps(results))
+"""
+
+
+def run(cmd, capture=False, stdin=None):
+    """
+    Run a command from the repo root.
+    - If capture=True, return stdout as text.
+    - stdin is passed through as a file object (streamed, never read into memory).
+    """
+    print("+", " ".join(cmd))
+    result = subprocess.run(
+        cmd, cwd=PROJECT_ROOT, text=True, stdin=stdin,
+        capture_output=capture, check=False,
+    )
+    if result.returncode != 0:
+        if capture:
+            print(result.stderr, file=sys.stderr)
+        raise subprocess.CalledProcessError(result.returncode, cmd)
+    return result.stdout if capture else None
+
+
+def load_env(env_path: Path):
+    """Read KEY=value pairs from .env (no interpolation, quotes stripped)."""
+    env = {}
+    for line in env_path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#") and "=" in line:
+            key, value = line.split("=", 1)
+            env[key.strip()] = value.strip().strip("'\"")
+    return env
+
+
+def django_shell(code: str):
+    """Run Python in the bench aa_cli container and return the JSON it prints."""
+    stdout = run(COMPOSE + ["run", "--rm", "-T", SERVICE_CLI, "shell", "-c", code], capture=True)
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(JSON_MARKER):
+            return json.loads(line[len(JSON_MARKER):])
+    raise RuntimeError("No benchmark output from Django shell")
+
+
+def db_status(env: dict):
+    """Return the MariaDB global status counters as {name: int}."""
+    stdout = run(
+        COMPOSE + [
+            "exec", "-T", SERVICE_DB, "mariadb", "-uroot",
+            f"-p{env['AA_DB_ROOT_PASSWORD']}", "-N", "-B", "-e", "SHOW GLOBAL STATUS",
+        ],
+        capture=True,
+    )
+    status = {}
+    for line in stdout.splitlines():
+        name, _, value = line.partition("\t")
+        if name in DB_COUNTERS:
+            status[name] = int(value)
+    return status
+
+
+def status_delta(before: dict, after: dict):
+    return {name: after.get(name, 0) - before.get(name, 0) for name in DB_COUNTERS}
+
+
+def fake_stats(service: str, reset=False):
+    """Fetch (or reset) the per-route request counters of a fake API server."""
+    method = "POST" if reset else "GET"
+    code = (
+        "import urllib.request; "
+        f"r = urllib.request.urlopen(urllib.request.Request('http://localhost:8080/_stats', method='{method}')); "
+        "print(r.read().decode())"
+    )
+    stdout = run(COMPOSE + ["exec", "-T", service, "python", "-c", code], capture=True)
+    return None if reset else json.loads(stdout)
+
+
+def beat_tasks(local_py: Path):
+    """Extract task names from CELERYBEAT_SCHEDULE[...] = {...} entries in local.py."""
+    tasks = []
+    for node in ast.walk(ast.parse(local_py.read_text())):
+        if not isinstance(node, ast.Assign) or not isinstance(node.value, ast.Dict):
+            continue
+        target = node.targets[0]
+        if not (isinstance(target, ast.Subscript) and getattr(target.value, "id", None) == "CELERYBEAT_SCHEDULE"):
+            continue
+        for key, value in zip(node.value.keys, node.value.values):
+            if isinstance(key, ast.Constant) and key.value == "task" and isinstance(value, ast.Constant):
+                tasks.append(value.value)
+    return tasks
+
+
+def parse_bytes(text: str):
+    """Parse docker stats sizes like '312.5MiB' or '1.2GB' into bytes."""
+    match = re.match(r"([\d.]+)\s*([KMGT]?i?B)", text.strip(), re.IGNORECASE)
+    if not match:
+        return 0
+    value, unit = match.groups()
+    powers = {"B": 0, "K": 1, "M": 2, "G": 3, "T": 4}
+    base = 1024 if "i" in unit else 1000
+    return int(float(value) * base ** powers[unit[0].upper()])
+
+
+class MemorySampler(threading.Thread):
+    """Polls `docker stats` for the bench containers and keeps the peak per container."""
+
+    def __init__(self, interval=2.0):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peaks = defaultdict(int)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.is_set():
+            ids = subprocess.run(
+                COMPOSE + ["ps", "-q"], cwd=PROJECT_ROOT, text=True, capture_output=True
+            ).stdout.split()
+            if ids:
+                stdout = subprocess.run(
+                    ["docker", "stats", "--no-stream", "--format", "{{.Name}}\t{{.MemUsage}}", *ids],
+                    text=True, capture_output=True,
+                ).stdout
+                for line in stdout.splitlines():
+                    name, _, usage = line.partition("\t")
+                    used = parse_bytes(usage.split("/")[0])
+                    self.peaks[name] = max(self.peaks[name], used)
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def summarize(latencies, errors, duration, statuses=None):
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "statuses": dict(sorted((statuses or {}).items())),
+        "throughput_rps": round(len(latencies) / duration, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+    }
+
+
+def drive_web(base_url: str, web: dict, cookie: str, duration: float, record=True):
+    """
+    Closed-loop load: `concurrency` workers issue weighted requests for `duration` seconds.
+
+    Only 2xx responses count as samples. Redirects are not followed and count
+    as errors (an expired session turns every auth endpoint into a fast 302),
+    and the status codes are recorded per endpoint.
+    """
+    endpoints = web["endpoints"]
+    weights = [e["weight"] for e in endpoints]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    statuses = defaultdict(lambda: defaultdict(int))
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    opener = urllib.request.build_opener(NoRedirect)
+
+    def worker(seed):
+        rng = random.Random(seed)
+        while time.monotonic() < deadline:
+            endpoint = rng.choices(endpoints, weights)[0]
+            request = urllib.request.Request(base_url + endpoint["path"])
+            if endpoint.get("auth"):
+                request.add_header("Cookie", cookie)
+            start = time.perf_counter()
+            try:
+                with opener.open(request, timeout=60) as response:
+                    response.read()
+                    status = str(response.status)
+            except urllib.error.HTTPError as e:
+                status = str(e.code)
+            except OSError:
+                status = "error"
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[endpoint["name"]][status] += 1
+                if status.startswith("2"):
+                    latencies[endpoint["name"]].append(elapsed)
+                else:
+                    errors[endpoint["name"]] += 1
+
+    threads = [
+        threading.Thread(target=worker, args=(web.get("seed", 0) + i,))
+        for i in range(web["concurrency"])
+    ]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    if not record:
+        return None
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    all_statuses = defaultdict(int)
+    for counts in statuses.values():
+        for status, count in counts.items():
+            all_statuses[status] += count
+    return {
+        "total": summarize(all_latencies, sum(errors.values()), elapsed, all_statuses),
+        "endpoints": {
+            e["name"]: summarize(latencies[e["name"]], errors[e["name"]], elapsed, statuses[e["name"]])
+            for e in endpoints
+        },
+    }
+
+
+def wait_for_web(base_url: str, timeout=300):
+    deadline = time.monotonic() + timeout
+    opener = urllib.request.build_opener(NoRedirect)
+    while time.monotonic() < deadline:
+        try:
+            opener.open(base_url + "/", timeout=5)
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(2)
+    raise RuntimeError(f"{base_url} did not come up within {timeout}s")
+
+
+def load_dump(env: dict, dump: Path):
+    """Stream a .sql or .sql.gz dump into the bench database."""
+    print(f"Loading {dump} into {env.get('AA_DB_NAME', 'alliance_auth')}...")
+    cmd = COMPOSE + [
+        "exec", "-T", SERVICE_DB, "mariadb", "-uroot",
+        f"-p{env['AA_DB_ROOT_PASSWORD']}", env.get("AA_DB_NAME", "alliance_auth"),
+    ]
+    if dump.suffix == ".gz":
+        gunzip = subprocess.Popen(["gunzip", "-c", str(dump)], stdout=subprocess.PIPE)
+        try:
+            run(cmd, stdin=gunzip.stdout)
+        finally:
+            gunzip.stdout.close()
+            if gunzip.wait() != 0:
+                raise subprocess.CalledProcessError(gunzip.returncode, ["gunzip", "-c", str(dump)])
+    else:
+        with open(dump, "rb") as fh:
+            run(cmd, stdin=fh)
+
+
+def fingerprint(env: dict):
+    files = {}
+    for name in FINGERPRINT_FILES:
+        path = PROJECT_ROOT / name
+        if path.exists():
+            files[name] = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+    rev = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True, capture_output=True
+    ).stdout.strip()
+    return {"git_rev": rev, "aa_docker_tag": env.get("AA_DOCKER_TAG"), "files": files}
+
+
+def cmd_run(args):
+    env = load_env(ENV_PATH)
+    scenario = json.loads(Path(args.scenario).read_text())
+    base_url = f"http://localhost:{env.get('BENCH_WEB_PORT', '8001')}"
+
+    print("Step 1: Starting benchmark stack...")
+    up = COMPOSE + ["up", "-d", "--wait"]
+    if not args.skip_build:
+        up.append("--build")
+    run(up)
+
+    try:
+        if args.db_dump:
+            print("Step 2: Loading database dump...")
+            load_dump(env, Path(args.db_dump))
+        print("Step 2: Running migrations...")
+        run(COMPOSE + ["run", "--rm", "-T", SERVICE_CLI, "migrate", "--noinput"])
+
+        print("Step 3: Creating benchmark session...")
+        session = django_shell(SESSION_CODE)
+        cookie = f"{session['name']}={session['value']}"
+        wait_for_web(base_url)
+
+        sampler = MemorySampler()
+        sampler.start()
+
+        web = scenario["web"]
+        print(f"Step 4: Web mix ({web['warmup']}s warmup, {web['duration']}s measured)...")
+        drive_web(base_url, web, cookie, web["warmup"], record=False)
+        before = db_status(env)
+        web_report = drive_web(base_url, web, cookie, web["duration"])
+        db_web = status_delta(before, db_status(env))
+
+        task_config = scenario["tasks"]
+        tasks = [
+            t for t in beat_tasks(PROJECT_ROOT / task_config["source"]) + task_config["extra"]
+            if t not in task_config["exclude"]
+        ]
+        print(f"Step 5: Sending {len(tasks)} task(s) x{task_config['repeat']} to the bench worker...")
+        for service in ("fake_esi", "fake_discord"):
+            fake_stats(service, reset=True)
+        before = db_status(env)
+        code = (
+            f"TASKS = {tasks * task_config['repeat']!r}\n"
+            f"TIMEOUT = {task_config.get('timeout', 1800)!r}\n" + TASK_CODE
+        )
+        task_runs = django_shell(code)
+        db_tasks = status_delta(before, db_status(env))
+        fakes = {service: fake_stats(service) for service in ("fake_esi", "fake_discord")}
+
+        sampler.stop()
+    finally:
+        if not args.keep_up:
+            print("Step 6: Stopping benchmark stack...")
+            run(COMPOSE + ["down"])
+
+    task_report = {}
+    for result in task_runs:
+        entry = task_report.setdefault(
+            result["task"], {"runs": 0, "seconds": [], "queries": 0, "errors": []}
+        )
+        entry["runs"] += 1
+        entry["seconds"].append(result["seconds"])
+        entry["queries"] = max(entry["queries"], result["queries"])
+        if result["error"]:
+            entry["errors"].append(result["error"])
+    for entry in task_report.values():
+        seconds = entry.pop("seconds")
+        entry["mean_s"] = round(sum(seconds) / len(seconds), 3)
+        entry["max_s"] = round(max(seconds), 3)
+
+    report = {
+        "label": args.label,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "config": fingerprint(env),
+        "scenario": scenario,
+        "web": web_report,
+        "tasks": task_report,
+        "containers": {name: {"peak_mem_bytes": peak} for name, peak in sorted(sampler.peaks.items())},
+        "db": {"web": db_web, "tasks": db_tasks},
+        "fakes": fakes,
+    }
+
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    out = Path(args.output) if args.output else REPORTS_DIR / f"{stamp}-{args.label}.json"
+    out.write_text(json.dumps(report, indent=2) + "\n")
+
+    total = web_report["total"]
+    print(f"\nWeb: {total['throughput_rps']} req/s, p99 {total['p99_ms']} ms, {total['errors']} error(s)")
+    for name, stats in web_report["endpoints"].items():
+        failed = {status: count for status, count in stats["statuses"].items() if not status.startswith("2")}
+        if failed:
+            print(f"  WARNING: {name} returned {failed} (3xx: redirecting URL or invalid session)")
+    print(f"DB queries: {db_web['Questions']} (web), {db_tasks['Questions']} (tasks)")
+    for name, stats in report["containers"].items():
+        print(f"  {name}: peak {stats['peak_mem_bytes'] / 2**20:.0f} MiB")
+    print(f"\nReport written to {out}")
+
+
+def comparable_metrics(report: dict):
+    """Flatten a report into {metric: (value, higher_is_better)}."""
+    metrics = {}
+    for scope, stats in [("web.total", report["web"]["total"])] + [
+        (f"web.{name}", stats) for name, stats in report["web"]["endpoints"].items()
+    ]:
+        metrics[f"{scope}.throughput_rps"] = (stats["throughput_rps"], True)
+        metrics[f"{scope}.p99_ms"] = (stats["p99_ms"], False)
+        metrics[f"{scope}.errors"] = (stats["errors"], False)
+    for name, stats in report["tasks"].items():
+        metrics[f"task.{name}.mean_s"] = (stats["mean_s"], False)
+        metrics[f"task.{name}.queries"] = (stats["queries"], False)
+    for name, stats in report["containers"].items():
+        metrics[f"mem.{name}"] = (stats["peak_mem_bytes"], False)
+    for phase, counters in report["db"].items():
+        metrics[f"db.{phase}.queries"] = (counters["Questions"], False)
+    return metrics
+
+
+def cmd_compare(args):
+    before = comparable_metrics(json.loads(Path(args.before).read_text()))
+    after = comparable_metrics(json.loads(Path(args.after).read_text()))
+
+    regressions = 0
+    print(f"{'metric':<60} {'before':>12} {'after':>12} {'change':>8}")
+    for metric in sorted(before.keys() & after.keys()):
+        (old, higher_is_better), (new, _) = before[metric], after[metric]
+        if old is None or new is None:
+            continue
+        if old:
+            change = (new - old) / old * 100
+        else:
+            # From zero (e.g. errors) any increase in a lower-is-better metric is a regression
+            change = math.inf if new > 0 and not higher_is_better else 0.0
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > args.threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{metric:<60} {old:>12} {new:>12} {change:>+7.1f}%{flag}")
+
+    if regressions:
+        print(f"\n{regressions} metric(s) regressed by more than {args.threshold}%.", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nNo regressions beyond {args.threshold}%.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmark and write a JSON report")
+    run_parser.add_argument("--label", default="run", help="Name for this configuration")
+    run_parser.add_argument("--scenario", default=str(SCENARIO_PATH))
+    run_parser.add_argument("--db-dump", help="SQL dump (.sql or .sql.gz) to load before running")
+    run_parser.add_argument("--output", help="Report path (default: bench/reports/<time>-<label>.json)")
+    run_parser.add_argument("--skip-build", action="store_true", help="Reuse existing images")
+    run_parser.add_argument("--keep-up", action="store_true", help="Leave the bench stack running")
+    run_parser.set_defaults(func=cmd_run)
+
+    compare_parser = sub.add_parser("compare", help="Compare two reports")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    compare_parser.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
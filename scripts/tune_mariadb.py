@@ -0,0 +1,740 @@
+#!/usr/bin/env python3
+"""
+MariaDB/MySQL tuning helper for Alliance Auth Docker deployment.
+
+Everything is read from the live database through `manage.py shell` in the
+aa_cli container, so it works for the external server as well as a local
+auth_mysql container.
+
+Commands:
+  inspect   Print table/index sizes, hot tables and buffer pool hit rate
+  enable-stats  Turn on MariaDB per-table read statistics (userstat) so the
+            working set can be sized from the tables that are actually read
+  generate  Write a config that fits a total memory budget to the working set
+  indexes   Recommend missing indexes for the heavy plugin tables
+            (notifications, wallet journal, assets)
+  measure   Time a sampled workload against those tables and save a JSON report
+  compare   Before/after latency report from two `measure` runs
+
+Typical flow:
+  python scripts/tune_mariadb.py enable-stats
+  (let it collect over a representative period, e.g. 24h)
+  python scripts/tune_mariadb.py measure --output before.json
+  python scripts/tune_mariadb.py generate --memory 1G --output conf/aa_mariadb.cnf
+  python scripts/tune_mariadb.py indexes
+  (apply config / indexes, restart the database)
+  python scripts/tune_mariadb.py measure --replay before.json --output after.json
+  python scripts/tune_mariadb.py compare before.json after.json
+
+Run this from the repo root.
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+SERVICE_CLI = "aa_cli"
+JSON_MARKER = "TUNE_JSON:"
+
+MB = 1024 ** 2
+GB = 1024 ** 3
+
+# Tables the big plugins write most of their rows to
+HEAVY_TABLE_PATTERN = re.compile(r"notification|wallet_?journal|asset", re.IGNORECASE)
+OWNER_COLUMN_PATTERN = re.compile(r"character|owner|corporation", re.IGNORECASE)
+LOCATION_COLUMN_PATTERN = re.compile(r"location", re.IGNORECASE)
+DATE_COLUMNS = ["timestamp", "date", "created", "created_at", "date_created", "last_updated"]
+MIN_HEAVY_ROWS = 10_000
+
+# Per-connection buffers kept from the hand-tuned config
+SESSION_BUFFERS = {
+    "sort_buffer_size": 256 * 1024,
+    "read_buffer_size": 256 * 1024,
+    "read_rnd_buffer_size": 512 * 1024,
+    "join_buffer_size": 256 * 1024,
+    "thread_stack": 192 * 1024,
+}
+CONNECTION_OVERHEAD = 1 * MB  # net buffers, THD and friends
+SERVER_OVERHEAD = 64 * MB
+KEY_BUFFER = 16 * MB
+ARIA_PAGECACHE = 16 * MB
+PERFORMANCE_SCHEMA = 400 * MB  # kept on for MySQL, its only source of table read statistics
+LOG_BUFFER = 8 * MB
+TMP_TABLE_SIZE = 32 * MB
+CONCURRENT_TMP_TABLES = 2
+BUFFER_POOL_CHUNK = 128 * MB
+MIN_CONNECTIONS = 10
+
+NO_STATS_WARNING = """\
+WARNING: No table read statistics available, so the working set is ALL InnoDB tables
+({size}) rather than the tables that are actually read. To size from the real workload:
+  - MariaDB: run `python scripts/tune_mariadb.py enable-stats` (SET GLOBAL userstat = 1),
+    or apply a config from `generate`, which sets `userstat = 1`
+  - MySQL: enable performance_schema
+then let it collect over a representative period (e.g. 24h) and run this again."""
+
+COLLECT_CODE = """
+import json
+from django.db import connection
+
+def rows(sql, params=None):
+    with connection.cursor() as c:
+        c.execute(sql, params)
+        names = [col[0].lower() for col in c.description]
+        return [dict(zip(names, row)) for row in c.fetchall()]
+
+tables = rows(
+    "SELECT table_name, engine, table_rows, data_length, index_length "
+    "FROM information_schema.tables WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE'"
+)
+hot, hot_source = [], None
+for source, sql in [
+    ("userstat", "SELECT table_name, rows_read AS read_count, rows_changed AS write_count "
+                 "FROM information_schema.table_statistics WHERE table_schema = DATABASE()"),
+    ("performance_schema", "SELECT object_name AS table_name, count_read AS read_count, count_write AS write_count "
+                           "FROM performance_schema.table_io_waits_summary_by_table WHERE object_schema = DATABASE()"),
+]:
+    try:
+        hot = rows(sql)
+    except Exception:
+        continue
+    if hot:
+        hot_source = source
+        break
+indexes = rows(
+    "SELECT table_name, index_name, seq_in_index, column_name "
+    "FROM information_schema.statistics WHERE table_schema = DATABASE() ORDER BY table_name, index_name, seq_in_index"
+)
+columns = rows(
+    "SELECT table_name, column_name, data_type FROM information_schema.columns "
+    "WHERE table_schema = DATABASE() ORDER BY table_name, ordinal_position"
+)
+with connection.cursor() as c:
+    c.execute("SHOW GLOBAL VARIABLES")
+    variables = dict(c.fetchall())
+    c.execute("SHOW GLOBAL STATUS")
+    status = dict(c.fetchall())
+print("TUNE_JSON:" + json.dumps({
+    "tables": tables, "hot": hot, "hot_source": hot_source, "indexes": indexes, "columns": columns,
+    "variables": variables, "status": status,
+}, default=str))
+"""
+
+MEASURE_CODE = """
+import json, random, statistics, time
+from django.db import connection
+
+def status():
+    with connection.cursor() as c:
+        c.execute("SHOW GLOBAL STATUS LIKE 'Innodb_buffer_pool_read%'")
+        return {k: int(v) for k, v in c.fetchall() if v.isdigit()}
+
+queries = CONFIG["queries"]
+rng = random.Random(CONFIG["seed"])
+with connection.cursor() as c:
+    for query in queries:
+        if query.get("params") is None and query.get("sample_sql"):
+            c.execute(query["sample_sql"])
+            values = [list(row) for row in c.fetchall()]
+            query["params"] = rng.sample(values, min(len(values), CONFIG["samples"]))
+        query.setdefault("params", [[]])
+
+    before = status()
+    results = []
+    for query in queries:
+        if not query["params"]:
+            continue
+        timings = []
+        for params in query["params"]:
+            for _ in range(CONFIG["repeat"]):
+                start = time.perf_counter()
+                c.execute(query["sql"], params or None)
+                c.fetchall()
+                timings.append(time.perf_counter() - start)
+        c.execute("EXPLAIN " + query["sql"], query["params"][0] or None)
+        names = [col[0].lower() for col in c.description]
+        plan = [dict(zip(names, row)) for row in c.fetchall()]
+        timings.sort()
+        results.append({
+            "name": query["name"], "sql": query["sql"], "params": query["params"],
+            "runs": len(timings),
+            "median_ms": round(statistics.median(timings) * 1000, 2),
+            "p99_ms": round(timings[max(0, -(-99 * len(timings) // 100) - 1)] * 1000, 2),
+            "plan": [{"table": p.get("table"), "type": p.get("type"), "key": p.get("key"),
+                      "rows": p.get("rows"), "extra": p.get("extra")} for p in plan],
+        })
+    after = status()
+print("TUNE_JSON:" + json.dumps({"queries": results, "status_before": before, "status_after": after}, default=str))
+"""
+
+
+ENABLE_STATS_CODE = """
+import json
+from django.db import connection
+
+error = None
+try:
+    with connection.cursor() as c:
+        c.execute("SET GLOBAL userstat = 1")
+except Exception as e:
+    error = str(e)
+print("TUNE_JSON:" + json.dumps({"error": error}))
+"""
+
+
+def run(cmd):
+    """Run a command from the repo root and return its stdout."""
+    print("+", " ".join(cmd[:6]), "...", file=sys.stderr)
+    result = subprocess.run(cmd, cwd=PROJECT_ROOT, text=True, capture_output=True)
+    if result.returncode != 0:
+        print("Command failed with stderr:", file=sys.stderr)
+        print(result.stderr, file=sys.stderr)
+        raise subprocess.CalledProcessError(result.returncode, cmd)
+    return result.stdout
+
+
+def django_shell(code: str):
+    """Run Python in the aa_cli container and return the JSON it prints."""
+    stdout = run(["docker", "compose", "run", "--rm", "-T", SERVICE_CLI, "shell", "-c", code])
+    for line in reversed(stdout.splitlines()):
+        if line.startswith(JSON_MARKER):
+            return json.loads(line[len(JSON_MARKER):])
+    raise RuntimeError("No output from Django shell")
+
+
+def parse_size(text: str):
+    """Parse sizes like '1G', '768M' or '4096' (bytes)."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMG]?)B?", text.strip(), re.IGNORECASE)
+    if not match:
+        raise argparse.ArgumentTypeError(f"invalid size: {text}")
+    value, unit = match.groups()
+    return int(float(value) * {"": 1, "K": 1024, "M": MB, "G": GB}[unit.upper()])
+
+
+def fmt_size(size: int):
+    """Format bytes the way my.cnf does (largest whole unit)."""
+    for unit, factor in (("G", GB), ("M", MB), ("K", 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    if size >= MB:
+        return f"{size // MB}M"
+    return str(size)
+
+
+def human(size):
+    return f"{size / MB:,.0f} MB" if size < GB else f"{size / GB:,.2f} GB"
+
+
+class Schema:
+    """Snapshot of the live schema and server counters."""
+
+    def __init__(self, data: dict):
+        self.tables = {t["table_name"]: t for t in data["tables"]}
+        self.hot = data["hot"]
+        self.hot_source = data["hot_source"]
+        self.variables = data["variables"]
+        self.status = data["status"]
+
+        self.indexes = {}
+        for row in data["indexes"]:
+            self.indexes.setdefault(row["table_name"], {}).setdefault(row["index_name"], []).append(
+                row["column_name"]
+            )
+        self.columns = {}
+        for row in data["columns"]:
+            self.columns.setdefault(row["table_name"], {})[row["column_name"]] = row["data_type"]
+
+    @property
+    def is_mariadb(self):
+        return "mariadb" in self.variables.get("version", "").lower()
+
+    def size(self, name):
+        table = self.tables[name]
+        return int(table["data_length"] or 0) + int(table["index_length"] or 0)
+
+    def total_size(self):
+        return sum(self.size(name) for name, t in self.tables.items() if (t["engine"] or "").lower() == "innodb")
+
+    def hot_tables(self, coverage=0.95):
+        """Tables that together account for `coverage` of row reads, hottest first."""
+        reads = sorted(
+            ((row["table_name"], int(row["read_count"] or 0)) for row in self.hot if row["table_name"] in self.tables),
+            key=lambda item: item[1],
+            reverse=True,
+        )
+        total = sum(count for _, count in reads)
+        if not total:
+            return []
+        hot, seen = [], 0
+        for name, count in reads:
+            if seen >= coverage * total:
+                break
+            hot.append((name, count))
+            seen += count
+        return hot
+
+    def working_set(self):
+        """Bytes of InnoDB data + indexes that are actually read, or everything if unknown."""
+        hot = self.hot_tables()
+        if not hot:
+            return self.total_size(), "all InnoDB tables (no table read statistics available)"
+        return sum(self.size(name) for name, _ in hot), f"{len(hot)} table(s) covering 95% of reads ({self.hot_source})"
+
+    def hit_rate(self):
+        requests = int(self.status.get("Innodb_buffer_pool_read_requests", 0))
+        reads = int(self.status.get("Innodb_buffer_pool_reads", 0))
+        return 1 - reads / requests if requests else None
+
+    def heavy_tables(self):
+        return sorted(
+            (
+                name for name, table in self.tables.items()
+                if HEAVY_TABLE_PATTERN.search(name) and int(table["table_rows"] or 0) >= MIN_HEAVY_ROWS
+            ),
+            key=self.size,
+            reverse=True,
+        )
+
+
+def collect():
+    return Schema(django_shell(COLLECT_CODE))
+
+
+class BudgetError(Exception):
+    """The memory budget cannot hold the fixed buffers, connections and a minimal pool."""
+
+
+def plan_memory(schema: Schema, budget: int, max_connections=None):
+    """
+    Split a memory budget between fixed buffers, connections and the buffer pool.
+
+    When max_connections is derived from the observed peak it is reduced (down
+    to that peak) to leave room for at least one buffer pool chunk. Raises
+    BudgetError if the budget still cannot fit, so the config never exceeds it.
+    """
+    per_connection = sum(SESSION_BUFFERS.values()) + CONNECTION_OVERHEAD
+    fixed = SERVER_OVERHEAD + KEY_BUFFER + LOG_BUFFER + TMP_TABLE_SIZE * CONCURRENT_TMP_TABLES
+    if schema.is_mariadb:
+        fixed += ARIA_PAGECACHE
+    else:
+        fixed += PERFORMANCE_SCHEMA
+
+    used = int(schema.status.get("Max_used_connections", 0))
+    notes = []
+    connections_basis = "set with --max-connections"
+    if max_connections is None:
+        max_connections = max(20, -(-int(used * 1.5) // 10) * 10) if used else 50
+        connections_basis = "1.5x observed peak" if used else "no observed peak"
+        fitting = (budget - fixed - BUFFER_POOL_CHUNK) // per_connection
+        floor = max(used, MIN_CONNECTIONS)
+        if fitting < max_connections and fitting >= floor:
+            notes.append(f"max_connections reduced from {max_connections} to {fitting} to fit the budget")
+            max_connections = fitting
+            connections_basis = "reduced to fit the budget"
+
+    connections = per_connection * max_connections
+    available = budget - fixed - connections
+    if available < BUFFER_POOL_CHUNK:
+        minimum = fixed + connections + BUFFER_POOL_CHUNK
+        raise BudgetError(
+            f"Budget {human(budget)} is too small: {human(fixed)} fixed buffers + "
+            f"{human(connections)} for {max_connections} connections + a {human(BUFFER_POOL_CHUNK)} "
+            f"minimum buffer pool needs at least {human(minimum)}"
+            + (f" (observed peak is {used} connections)" if used else "")
+            + "."
+        )
+
+    working_set, basis = schema.working_set()
+    wanted = -(-int(working_set * 1.1) // BUFFER_POOL_CHUNK) * BUFFER_POOL_CHUNK
+    pool = max(min(wanted, available // BUFFER_POOL_CHUNK * BUFFER_POOL_CHUNK), BUFFER_POOL_CHUNK)
+    total = fixed + connections + pool
+    if total > budget:
+        raise BudgetError(f"Planned {human(total)} exceeds the {human(budget)} budget")
+    return {
+        "budget": budget,
+        "total": total,
+        "max_connections": max_connections,
+        "connections_basis": connections_basis,
+        "per_connection": per_connection,
+        "connections": connections,
+        "fixed": fixed,
+        "working_set": working_set,
+        "working_set_basis": basis,
+        "buffer_pool": pool,
+        "fits": pool >= wanted,
+        "notes": notes,
+        "table_open_cache": max(400, len(schema.tables) * 2),
+        "table_definition_cache": len(schema.tables) + 400,
+    }
+
+
+def render_config(schema: Schema, plan: dict):
+    """Render a my.cnf fragment in the layout of conf/aa_mariadb.cnf."""
+    log_size = min(max(plan["buffer_pool"] // 4, 48 * MB), 1 * GB)
+    version = schema.variables.get("version", "unknown")
+    lines = [
+        "[mariadb]" if schema.is_mariadb else "[mysqld]",
+        f"# Generated by scripts/tune_mariadb.py on {datetime.now(timezone.utc):%Y-%m-%d} for {version}",
+        f"# Memory budget {human(plan['budget'])}: {human(plan['fixed'])} fixed, "
+        f"{human(plan['connections'])} for {plan['max_connections']} connections, "
+        f"{human(plan['buffer_pool'])} buffer pool ({human(plan['total'])} total)",
+        f"# Working set {human(plan['working_set'])}: {plan['working_set_basis']}",
+    ]
+    lines += [f"# NOTE: {note}" for note in plan["notes"]]
+    if not plan["fits"]:
+        lines.append("# WARNING: working set does not fit the budget, expect reads from disk")
+    lines += [
+        "",
+        "# Memory limits (sized to the working set)",
+        f"innodb_buffer_pool_size = {fmt_size(plan['buffer_pool'])}",
+        f"key_buffer_size = {fmt_size(KEY_BUFFER)}",
+    ]
+    if schema.is_mariadb:
+        lines.append(f"aria_pagecache_buffer_size = {fmt_size(ARIA_PAGECACHE)}")
+    lines += ["", "# Reduce per-connection memory usage"]
+    lines += [f"{name} = {fmt_size(size)}" for name, size in SESSION_BUFFERS.items()]
+    lines += [
+        "",
+        "# InnoDB logging",
+        f"innodb_log_buffer_size = {fmt_size(LOG_BUFFER)}",
+    ]
+    if schema.is_mariadb or not re.match(r"8\.(0\.(3\d|[4-9]\d)|[1-9])", version):
+        lines.append(f"innodb_log_file_size = {fmt_size(log_size)}")
+    else:
+        lines.append(f"innodb_redo_log_capacity = {fmt_size(log_size * 2)}")
+    lines += [
+        "",
+        "# Avoid caching table data twice (OS page cache + buffer pool)",
+        "innodb_flush_method = O_DIRECT",
+        "",
+    ]
+    if schema.is_mariadb:
+        lines += [
+            "# Disable performance schema (saves ~400MB)",
+            "performance_schema = OFF",
+            "",
+            "# Per-table read statistics (cheap) so the next run can size to the hot tables",
+            "userstat = 1",
+            "",
+        ]
+    else:
+        lines += [
+            "# Performance schema stays on: it is MySQL's only source of table read",
+            "# statistics (its memory is counted in the fixed budget above)",
+            "performance_schema = ON",
+            "",
+        ]
+    lines += [
+        "# Prevent binary log growth (not needed without replication)",
+        "skip-log-bin",
+        "",
+        "# Limit InnoDB file growth",
+        "innodb_file_per_table = 1",
+        "innodb_autoextend_increment = 8",
+        "",
+        "# Disable general/slow query logs (use only for debugging)",
+        "general_log = 0",
+        "slow_query_log = 0",
+        "",
+        "# Limit temp table sizes",
+        f"tmp_table_size = {fmt_size(TMP_TABLE_SIZE)}",
+        f"max_heap_table_size = {fmt_size(TMP_TABLE_SIZE)}",
+        "",
+        "# Table caches (sized to the schema)",
+        f"table_open_cache = {plan['table_open_cache']}",
+        f"table_definition_cache = {plan['table_definition_cache']}",
+        "",
+        f"# Connection limits ({plan['connections_basis']})",
+        f"max_connections = {plan['max_connections']}",
+        "skip-name-resolve = 1",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def recommend_indexes(schema: Schema):
+    """
+    Suggest indexes missing on the heavy plugin tables.
+
+    Tables with a date column get (owner, date) and (date); tables without one
+    (assets) get (owner, location). Returns (recommendations, covered) where
+    covered lists the heavy tables whose existing indexes already match.
+    """
+    recommendations = []
+    covered = []
+    for table in schema.heavy_tables():
+        columns = schema.columns.get(table, {})
+        existing = list(schema.indexes.get(table, {}).values())
+        owner = next(
+            (c for c in columns if c.endswith("_id") and OWNER_COLUMN_PATTERN.search(c)), None
+        )
+        date = next(
+            (c for c in DATE_COLUMNS if columns.get(c) in ("datetime", "timestamp", "date")), None
+        )
+        location = next(
+            (c for c in columns if c.endswith("_id") and LOCATION_COLUMN_PATTERN.search(c)), None
+        )
+
+        wanted = []
+        if date:
+            if owner:
+                wanted.append(([owner, date], f"per-{owner[:-3]} lists ordered by {date}"))
+            wanted.append(([date], f"retention purges and range scans on {date}"))
+        elif owner and location:
+            wanted.append(([owner, location], f"per-{owner[:-3]} lookups by {location[:-3]}"))
+        elif owner:
+            wanted.append(([owner], f"per-{owner[:-3]} lookups"))
+        if not wanted:
+            covered.append((table, "no owner, location or date column to index"))
+            continue
+
+        missing = 0
+        for index_columns, reason in wanted:
+            if any(cols[: len(index_columns)] == index_columns for cols in existing):
+                continue
+            missing += 1
+            name = f"tune_{table}_{'_'.join(index_columns)}"[:64]
+            recommendations.append(
+                {
+                    "table": table,
+                    "columns": index_columns,
+                    "reason": reason,
+                    "rows": int(schema.tables[table]["table_rows"] or 0),
+                    "sql": f"ALTER TABLE `{table}` ADD INDEX `{name}` "
+                    f"({', '.join(f'`{c}`' for c in index_columns)}), ALGORITHM=INPLACE, LOCK=NONE;",
+                }
+            )
+        if not missing:
+            covered.append((table, "existing indexes cover " + ", ".join(
+                "(" + ", ".join(cols) + ")" for cols, _ in wanted
+            )))
+    return recommendations, covered
+
+
+def sample_workload(schema: Schema):
+    """Representative queries for the heavy tables, mirroring what the plugins run."""
+    queries = []
+    for table in schema.heavy_tables():
+        columns = schema.columns.get(table, {})
+        owner = next(
+            (c for c in columns if c.endswith("_id") and OWNER_COLUMN_PATTERN.search(c)), None
+        )
+        date = next(
+            (c for c in DATE_COLUMNS if columns.get(c) in ("datetime", "timestamp", "date")), None
+        )
+        location = next(
+            (c for c in columns if c.endswith("_id") and LOCATION_COLUMN_PATTERN.search(c)), None
+        )
+        if owner and date:
+            queries.append({
+                "name": f"{table}: latest by {owner}",
+                "sql": f"SELECT * FROM `{table}` WHERE `{owner}` = %s ORDER BY `{date}` DESC LIMIT 100",
+                "sample_sql": f"SELECT `{owner}` FROM `{table}` GROUP BY `{owner}` LIMIT 1000",
+            })
+        elif owner and location:
+            queries.append({
+                "name": f"{table}: by {owner} and {location}",
+                "sql": f"SELECT * FROM `{table}` WHERE `{owner}` = %s AND `{location}` = %s LIMIT 500",
+                "sample_sql": f"SELECT `{owner}`, `{location}` FROM `{table}` "
+                f"GROUP BY `{owner}`, `{location}` LIMIT 1000",
+            })
+        elif owner:
+            queries.append({
+                "name": f"{table}: by {owner}",
+                "sql": f"SELECT * FROM `{table}` WHERE `{owner}` = %s LIMIT 500",
+                "sample_sql": f"SELECT `{owner}` FROM `{table}` GROUP BY `{owner}` LIMIT 1000",
+            })
+        if date:
+            queries.append({
+                "name": f"{table}: retention count",
+                "sql": f"SELECT COUNT(*) FROM `{table}` WHERE `{date}` < NOW() - INTERVAL 90 DAY",
+            })
+    return queries
+
+
+def cmd_inspect(args):
+    schema = collect()
+    print(f"Server: {schema.variables.get('version')}")
+    print(f"innodb_buffer_pool_size: {human(int(schema.variables.get('innodb_buffer_pool_size', 0)))}")
+    hit_rate = schema.hit_rate()
+    if hit_rate is not None:
+        print(f"Buffer pool hit rate: {hit_rate:.2%}")
+    print(f"Max used connections: {schema.status.get('Max_used_connections')} / {schema.variables.get('max_connections')}")
+    print(f"InnoDB data + indexes: {human(schema.total_size())}")
+    working_set, basis = schema.working_set()
+    print(f"Working set: {human(working_set)} ({basis})\n")
+
+    print(f"{'table':<55} {'rows':>12} {'data':>12} {'index':>12}")
+    for name in sorted(schema.tables, key=schema.size, reverse=True)[: args.top]:
+        table = schema.tables[name]
+        print(
+            f"{name:<55} {int(table['table_rows'] or 0):>12,} "
+            f"{human(int(table['data_length'] or 0)):>12} {human(int(table['index_length'] or 0)):>12}"
+        )
+
+    hot = schema.hot_tables()
+    if hot:
+        print(f"\nHot tables ({schema.hot_source}):")
+        for name, reads in hot[: args.top]:
+            print(f"  {name:<53} {reads:>12,} rows read")
+    else:
+        print("\n" + NO_STATS_WARNING.format(size=human(working_set)), file=sys.stderr)
+
+
+def cmd_enable_stats(args):
+    schema = collect()
+    if not schema.is_mariadb:
+        print("userstat is MariaDB only; on MySQL enable performance_schema instead.", file=sys.stderr)
+        sys.exit(1)
+    result = django_shell(ENABLE_STATS_CODE)
+    if result["error"]:
+        print(
+            f"ERROR: {result['error']}\n"
+            "The auth database user needs the SUPER (or SYSTEM_VARIABLES_ADMIN) privilege; run\n"
+            "`SET GLOBAL userstat = 1;` as root instead, or apply a config from `generate`.",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+    print(
+        "userstat enabled until the next restart (the config from `generate` keeps it on).\n"
+        "Let it collect over a representative period, e.g. 24h, then run `inspect` or `generate`."
+    )
+
+
+def cmd_generate(args):
+    schema = collect()
+    try:
+        plan = plan_memory(schema, args.memory, args.max_connections)
+    except BudgetError as e:
+        print(f"ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    config = render_config(schema, plan)
+    if args.output:
+        Path(args.output).write_text(config)
+        print(f"Config written to {args.output}", file=sys.stderr)
+    else:
+        print(config, end="")
+    for note in plan["notes"]:
+        print(f"NOTE: {note}", file=sys.stderr)
+    if schema.hot_source is None:
+        print(NO_STATS_WARNING.format(size=human(plan["working_set"])), file=sys.stderr)
+    if not plan["fits"]:
+        print(
+            f"WARNING: working set {human(plan['working_set'])} does not fit in "
+            f"{human(plan['buffer_pool'])} buffer pool; raise --memory to avoid disk reads.",
+            file=sys.stderr,
+        )
+
+
+def cmd_indexes(args):
+    recommendations, covered = recommend_indexes(collect())
+    if not recommendations and not covered:
+        print(f"No heavy plugin tables found (>= {MIN_HEAVY_ROWS:,} rows).")
+        return
+    if recommendations:
+        print("-- Recommended indexes (review before applying; plugin migrations own these tables)")
+    for rec in recommendations:
+        print(f"-- {rec['table']} ({rec['rows']:,} rows): {rec['reason']}")
+        print(rec["sql"])
+    for table, reason in covered:
+        print(f"-- {table}: no index needed, {reason}")
+
+
+def cmd_measure(args):
+    if args.replay:
+        previous = json.loads(Path(args.replay).read_text())
+        queries = [{"name": q["name"], "sql": q["sql"], "params": q["params"]} for q in previous["queries"]]
+    else:
+        queries = sample_workload(collect())
+    if args.workload:
+        for i, sql in enumerate(s.strip() for s in Path(args.workload).read_text().split(";")):
+            if sql:
+                queries.append({"name": f"workload #{i + 1}", "sql": sql})
+    if not queries:
+        print("No heavy tables found and no --workload given. Nothing to measure.", file=sys.stderr)
+        sys.exit(1)
+
+    config = {"queries": queries, "seed": args.seed, "samples": args.samples, "repeat": args.repeat}
+    result = django_shell(f"CONFIG = {json.dumps(config)!r}\nimport json\nCONFIG = json.loads(CONFIG)\n" + MEASURE_CODE)
+    before, after = result.pop("status_before"), result.pop("status_after")
+    requests = after.get("Innodb_buffer_pool_read_requests", 0) - before.get("Innodb_buffer_pool_read_requests", 0)
+    reads = after.get("Innodb_buffer_pool_reads", 0) - before.get("Innodb_buffer_pool_reads", 0)
+    result["created"] = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    result["disk_reads"] = reads
+    result["hit_rate"] = round(1 - reads / requests, 4) if requests else None
+
+    for query in result["queries"]:
+        plan = ", ".join(f"{p['table']}:{p['type']}/{p['key'] or '-'}" for p in query["plan"])
+        print(f"{query['name']:<70} median {query['median_ms']:>9} ms  p99 {query['p99_ms']:>9} ms  [{plan}]")
+    print(f"\nBuffer pool: {reads:,} disk reads during the run, hit rate {result['hit_rate']}")
+    Path(args.output).write_text(json.dumps(result, indent=2) + "\n")
+    print(f"Report written to {args.output}")
+
+
+def cmd_compare(args):
+    before = {q["name"]: q for q in json.loads(Path(args.before).read_text())["queries"]}
+    after_report = json.loads(Path(args.after).read_text())
+    after = {q["name"]: q for q in after_report["queries"]}
+
+    print(f"{'query':<70} {'median before':>14} {'after':>10} {'p99 before':>11} {'after':>10}")
+    for name in before:
+        if name not in after:
+            continue
+        old, new = before[name], after[name]
+        change = (new["median_ms"] - old["median_ms"]) / old["median_ms"] * 100 if old["median_ms"] else 0.0
+        print(
+            f"{name:<70} {old['median_ms']:>11} ms {new['median_ms']:>7} ms "
+            f"{old['p99_ms']:>8} ms {new['p99_ms']:>7} ms  ({change:+.1f}%)"
+        )
+    before_report = json.loads(Path(args.before).read_text())
+    print(
+        f"\nDisk reads: {before_report.get('disk_reads')} -> {after_report.get('disk_reads')}, "
+        f"hit rate: {before_report.get('hit_rate')} -> {after_report.get('hit_rate')}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    inspect_parser = sub.add_parser("inspect", help="Show sizes, hot tables and hit rate")
+    inspect_parser.add_argument("--top", type=int, default=20)
+    inspect_parser.set_defaults(func=cmd_inspect)
+
+    stats_parser = sub.add_parser("enable-stats", help="SET GLOBAL userstat = 1 (MariaDB)")
+    stats_parser.set_defaults(func=cmd_enable_stats)
+
+    generate_parser = sub.add_parser("generate", help="Generate a config for a memory budget")
+    generate_parser.add_argument("--memory", type=parse_size, required=True, help="Total budget, e.g. 1G or 768M")
+    generate_parser.add_argument("--max-connections", type=int, help="Default: 1.5x Max_used_connections")
+    generate_parser.add_argument("--output", help="Write to this file instead of stdout")
+    generate_parser.set_defaults(func=cmd_generate)
+
+    indexes_parser = sub.add_parser("indexes", help="Recommend missing indexes")
+    indexes_parser.set_defaults(func=cmd_indexes)
+
+    measure_parser = sub.add_parser("measure", help="Time a sampled workload")
+    measure_parser.add_argument("--output", required=True)
+    measure_parser.add_argument("--replay", help="Re-run the exact queries and parameters of a previous report")
+    measure_parser.add_argument("--workload", help="Extra SQL file (statements separated by ';')")
+    measure_parser.add_argument("--samples", type=int, default=20, help="Parameter values sampled per query")
+    measure_parser.add_argument("--repeat", type=int, default=3, help="Runs per parameter value")
+    measure_parser.add_argument("--seed", type=int, default=1)
+    measure_parser.set_defaults(func=cmd_measure)
+
+    compare_parser = sub.add_parser("compare", help="Before/after latency report")
+    compare_parser.add_argument("before")
+    compare_parser.add_argument("after")
+    compare_parser.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,16 +5,23 @@ End-to-end update helper for Alliance Auth Docker deployment.
 Flow:
  1. Run `python manage.py packagemonitorcli install` inside allianceauth_cli
  2. Parse `pkg==version` specs from its output
- 3. Update ONLY matching packages in conf/requirements.txt
- 4. docker compose build
- 5. docker compose --env-file=.env up -d
- 6. Run migrations and collectstatic inside the new image
+ 3. Preflight: resolve the new requirement set (plus the allianceauth pin from
+    Dockerfile) offline against the local wheelhouse, fetching only missing
+    wheels, and stop right away on conflicts
+ 4. Update ONLY matching packages in conf/requirements.txt
+ 5. docker compose build (installs from the wheelhouse, see custom.dockerfile)
+ 6. docker compose --env-file=.env up -d
+ 7. Run migrations and collectstatic inside the new image
 
 Run this from the repo root:
-  python scripts/update_from_packagemonitor.py
+  python scripts/update_from_packagemonitor.py [--preflight-only] [--refresh-base]
 """
 
+import argparse
+import json
+import os
 import re
+import shutil
 import subprocess
 import sys
 from pathlib import Path
@@ -22,8 +29,16 @@ from pathlib import Path
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 REQ_PATH = PROJECT_ROOT / "conf" / "requirements.txt"
+DOCKERFILE_PATH = PROJECT_ROOT / "Dockerfile"
+ENV_PATH = PROJECT_ROOT / ".env"
+WHEELHOUSE = PROJECT_ROOT / "wheelhouse"
+WHEELHOUSE_BASE = WHEELHOUSE / "base"
+PREFLIGHT_DIR = WHEELHOUSE / "preflight"
 SERVICE_CLI = "aa_cli"
 
+# Refresh the cached base wheel layer once this many packages differ from it
+BASE_REFRESH_THRESHOLD = 10
+
 
 def run(cmd, capture=False, allow_failure=False):
     """
@@ -82,10 +97,10 @@ def load_existing_packages(req_path: Path):
     return packages, lines
 
 
-def update_requirements(req_path: Path, updates: dict):
+def plan_requirements(req_path: Path, updates: dict):
     """
     Only updates packages already present in requirements.txt.
-    Returns (updated_count, ignored_count).
+    Returns (new_lines, updated_count, ignored_count) without writing anything.
     """
     pkg_map, lines = load_existing_packages(req_path)
     updated = 0
@@ -100,11 +115,152 @@ def update_requirements(req_path: Path, updates: dict):
         else:
             ignored += 1
 
-    req_path.write_text("\n".join(lines) + "\n")
-    return updated, ignored
+    return lines, updated, ignored
+
+
+def read_env(env_path: Path, key: str):
+    """Return a single KEY=value from .env, or None."""
+    if not env_path.exists():
+        return None
+    for line in env_path.read_text().splitlines():
+        if line.strip().startswith(f"{key}="):
+            return line.split("=", 1)[1].strip().strip("'\"")
+    return None
+
+
+def auth_pin(dockerfile: Path):
+    """
+    Build the allianceauth pin from `ARG AUTH_VERSION=...` in Dockerfile.
+    """
+    m = re.search(r"^ARG\s+AUTH_VERSION=v?(\S+)", dockerfile.read_text(), re.MULTILINE)
+    if not m:
+        raise RuntimeError(f"AUTH_VERSION not found in {dockerfile}")
+    return f"allianceauth=={m.group(1)}"
+
+
+def pip_in_image(image: str, args: list):
+    """
+    Run pip inside the auth image with the wheelhouse mounted at /wheelhouse.
+    Returns (stdout, stderr, returncode).
+    """
+    cmd = [
+        "docker", "run", "--rm",
+        "--user", f"{os.getuid()}:{os.getgid()}",
+        "-e", "HOME=/tmp",
+        "-e", "PIP_DISABLE_PIP_VERSION_CHECK=1",
+        "-v", f"{WHEELHOUSE}:/wheelhouse",
+        "--entrypoint", "pip",
+        image,
+        *args,
+    ]
+    return run(cmd, allow_failure=True)
+
+
+def resolve_offline(image: str):
+    """
+    Dry-run install of the preflight requirement set using only local wheels.
+    Returns (install_report or None, pip stderr).
+    """
+    _, stderr, rc = pip_in_image(
+        image,
+        [
+            "install", "--dry-run", "--no-index", "--find-links=/wheelhouse",
+            "--report", "/wheelhouse/preflight/report.json",
+            "-r", "/wheelhouse/preflight/requirements.txt",
+            "-c", "/wheelhouse/preflight/constraints.txt",
+        ],
+    )
+    if rc != 0:
+        return None, stderr
+    return json.loads((PREFLIGHT_DIR / "report.json").read_text()), stderr
+
+
+def is_conflict(stderr: str):
+    return "ResolutionImpossible" in stderr or "conflict" in stderr.lower()
+
+
+def print_pip_error(stderr: str):
+    for line in stderr.strip().splitlines()[-20:]:
+        print(f"    {line}", file=sys.stderr)
+
+
+def preflight(image: str, lines: list, pin: str):
+    """
+    Resolve the new requirement set against the local wheelhouse.
+
+    If the offline resolve fails, missing wheels are fetched once with
+    `pip wheel` (the only online step) and the set is resolved again; a
+    conflict is only reported from that second attempt.
+    Returns the list of wheels the image build will install, or exits on conflict.
+    """
+    PREFLIGHT_DIR.mkdir(parents=True, exist_ok=True)
+    (PREFLIGHT_DIR / "requirements.txt").write_text("\n".join(lines) + "\n")
+    (PREFLIGHT_DIR / "constraints.txt").write_text(pin + "\n")
+
+    report, stderr = resolve_offline(image)
+    if report is None:
+        # pip --no-index reports a missing wheel as ResolutionImpossible when
+        # several requirements share the dependency, so always fetch first and
+        # only trust the error from the fetch or the re-resolve.
+        print("  Offline resolution failed, fetching missing distributions...")
+        _, stderr, rc = pip_in_image(
+            image,
+            [
+                "wheel", "--wheel-dir=/wheelhouse", "--find-links=/wheelhouse",
+                "-r", "/wheelhouse/preflight/requirements.txt",
+                "-c", "/wheelhouse/preflight/constraints.txt",
+            ],
+        )
+        if rc == 0:
+            report, stderr = resolve_offline(image)
+
+    if report is None:
+        kind = "Dependency conflict" if is_conflict(stderr) else "Resolution failed"
+        print(f"\nERROR: {kind} in the new requirement set (with {pin}):", file=sys.stderr)
+        print_pip_error(stderr)
+        print("conf/requirements.txt was NOT modified.", file=sys.stderr)
+        sys.exit(1)
+
+    wheels = []
+    for item in report.get("install", []):
+        meta = item["metadata"]
+        wheels.append(Path(item["download_info"]["url"]).name)
+        print(f"  - will install {meta['name']}=={meta['version']}")
+    return wheels
+
+
+def refresh_base(wheels: list, lines: list, force: bool):
+    """
+    Keep wheelhouse/base (the cached base layer in custom.dockerfile) close to
+    the current set so each image build only installs the changed wheels on top.
+    """
+    base_wheels = {p.name for p in WHEELHOUSE_BASE.glob("*.whl")}
+    changed = [w for w in wheels if w not in base_wheels]
+    print(f"  {len(changed)} wheel(s) differ from the cached base layer.")
+    if not force and base_wheels and len(changed) < BASE_REFRESH_THRESHOLD:
+        return
+
+    print("  Refreshing wheelhouse/base (next build reinstalls the base layer once)...")
+    WHEELHOUSE_BASE.mkdir(parents=True, exist_ok=True)
+    for old in WHEELHOUSE_BASE.glob("*.whl"):
+        old.unlink()
+    for wheel in wheels:
+        shutil.copy2(WHEELHOUSE / wheel, WHEELHOUSE_BASE / wheel)
+    (WHEELHOUSE_BASE / "requirements.txt").write_text("\n".join(lines) + "\n")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Update packages flagged by Package Monitor.")
+    parser.add_argument(
+        "--preflight-only", action="store_true",
+        help="Resolve and fill the wheelhouse, but do not modify requirements or deploy",
+    )
+    parser.add_argument(
+        "--refresh-base", action="store_true",
+        help="Rebuild the cached base wheel layer from the new requirement set",
+    )
+    args = parser.parse_args()
+
     if not REQ_PATH.exists():
         print(f"ERROR: requirements file not found at {REQ_PATH}", file=sys.stderr)
         sys.exit(1)
@@ -145,21 +301,38 @@ def main():
         sys.exit(1)
 
     print(f"  Found {len(specs)} package spec(s) from packagemonitor CLI.")
-    print("Step 3: Updating existing packages in conf/requirements.txt...")
-    updated, ignored = update_requirements(REQ_PATH, specs)
-    print(f"  Updated {updated} package(s). Ignored {ignored} not present in requirements.txt.\n")
+    lines, updated, ignored = plan_requirements(REQ_PATH, specs)
+    print(f"  {updated} package(s) to update. Ignored {ignored} not present in requirements.txt.\n")
 
     if updated == 0:
         print("No packages were updated. Skipping rebuild / deploy.")
         sys.exit(0)
 
-    print("Step 4: Rebuilding Docker images...")
+    image = read_env(ENV_PATH, "AA_DOCKER_TAG")
+    if not image:
+        print(f"ERROR: AA_DOCKER_TAG not set in {ENV_PATH}", file=sys.stderr)
+        sys.exit(1)
+    pin = auth_pin(DOCKERFILE_PATH)
+    print(f"Step 3: Preflight resolving against {WHEELHOUSE.name}/ (with {pin})...")
+    wheels = preflight(image, lines, pin)
+    print("  Preflight OK.\n")
+
+    if args.preflight_only:
+        print("--preflight-only given. Leaving conf/requirements.txt and wheelhouse/base unchanged.")
+        sys.exit(0)
+
+    refresh_base(wheels, lines, args.refresh_base)
+
+    print("Step 4: Updating existing packages in conf/requirements.txt...")
+    REQ_PATH.write_text("\n".join(lines) + "\n")
+
+    print("Step 5: Rebuilding Docker images...")
     run(["docker", "compose", "build"])
 
-    print("Step 5: Bringing stack up with new images...")
+    print("Step 6: Bringing stack up with new images...")
     run(["docker", "compose", "up", "-d"])
 
-    print("Step 6: Running migrations...")
+    print("Step 7: Running migrations...")
     run(
         [
             "docker",
@@ -171,7 +344,7 @@ def main():
         ]
     )
 
-    print("Step 7: Running collectstatic...")
+    print("Step 8: Running collectstatic...")
     run(
         [
             "docker",
@@ -0,0 +1,86 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import tune_mariadb  # noqa: E402
+from tune_mariadb import BUFFER_POOL_CHUNK, GB, MB, BudgetError, Schema, plan_memory  # noqa: E402
+
+
+def make_schema(working_set, version="11.8.2-MariaDB", max_used_connections=0):
+    return Schema(
+        {
+            "tables": [
+                {
+                    "table_name": "app_table",
+                    "engine": "InnoDB",
+                    "table_rows": 1000,
+                    "data_length": working_set,
+                    "index_length": 0,
+                }
+            ],
+            "hot": [],
+            "hot_source": None,
+            "indexes": [],
+            "columns": [],
+            "variables": {"version": version},
+            "status": {"Max_used_connections": max_used_connections},
+        }
+    )
+
+
+class PlanMemoryTest(unittest.TestCase):
+    def test_small_working_set_gets_one_chunk(self):
+        plan = plan_memory(make_schema(50 * MB), 1 * GB)
+        self.assertEqual(plan["buffer_pool"], BUFFER_POOL_CHUNK)
+        self.assertTrue(plan["fits"])
+
+    def test_working_set_is_rounded_up_to_a_chunk(self):
+        plan = plan_memory(make_schema(300 * MB), 1 * GB)
+        self.assertEqual(plan["buffer_pool"], 384 * MB)
+        self.assertTrue(plan["fits"])
+
+    def test_large_working_set_is_capped_to_the_budget(self):
+        plan = plan_memory(make_schema(4 * GB), 1 * GB)
+        self.assertEqual(plan["buffer_pool"] % BUFFER_POOL_CHUNK, 0)
+        self.assertFalse(plan["fits"])
+        self.assertLessEqual(plan["total"], 1 * GB)
+
+    def test_total_never_exceeds_budget(self):
+        for budget in (512 * MB, 768 * MB, 1 * GB, 2 * GB):
+            for working_set in (1 * MB, 300 * MB, 1 * GB, 8 * GB):
+                plan = plan_memory(make_schema(working_set), budget)
+                self.assertLessEqual(plan["total"], budget)
+                self.assertGreaterEqual(plan["buffer_pool"], BUFFER_POOL_CHUNK)
+
+    def test_max_connections_reduced_to_fit(self):
+        plan = plan_memory(make_schema(1 * GB, max_used_connections=60), 512 * MB)
+        self.assertLess(plan["max_connections"], 90)
+        self.assertGreaterEqual(plan["max_connections"], 60)
+        self.assertTrue(plan["notes"])
+
+    def test_budget_too_small(self):
+        with self.assertRaises(BudgetError):
+            plan_memory(make_schema(50 * MB), 256 * MB)
+
+
+class RenderConfigTest(unittest.TestCase):
+    def render(self, version):
+        schema = make_schema(300 * MB, version=version)
+        return tune_mariadb.render_config(schema, plan_memory(schema, 2 * GB))
+
+    def test_mariadb_uses_userstat(self):
+        config = self.render("11.8.2-MariaDB")
+        self.assertIn("performance_schema = OFF", config)
+        self.assertIn("userstat = 1", config)
+
+    def test_mysql_keeps_performance_schema(self):
+        config = self.render("8.0.36")
+        self.assertIn("performance_schema = ON", config)
+        self.assertNotIn("performance_schema = OFF", config)
+        self.assertNotIn("userstat", config)
+
+
+if __name__ == "__main__":
+    unittest.main()